@@ -1,495 +1,720 @@
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import os
-import pandas as pd
-from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
-
-# 環境変数を読み込み
-load_dotenv()
-
-app = FastAPI(
-    title="YouTube マーケティング分析ツール",
-    description="YouTubeの動画・チャンネル分析、競合分析、トレンド分析を行うツール",
-    version="1.0.0"
-)
-
-# CORS設定
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# YouTube API設定
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-youtube = None
-
-# レスポンスモデル
-class VideoInfo(BaseModel):
-    video_id: str
-    title: str
-    channel_id: str
-    channel_title: str
-    published_at: str
-    view_count: int
-    like_count: int
-    comment_count: int
-    duration: str
-    thumbnail_url: str
-    engagement_rate: float
-    description: str
-
-class ChannelInfo(BaseModel):
-    channel_id: str
-    title: str
-    description: str
-    subscriber_count: int
-    video_count: int
-    view_count: int
-    published_at: str
-    thumbnail_url: str
-    average_views: float
-
-class ChannelComparison(BaseModel):
-    channels: List[ChannelInfo]
-    comparison_metrics: Dict[str, Any]
-
-def initialize_youtube_api():
-    """YouTube APIクライアントを初期化"""
-    global youtube
-    try:
-        if not YOUTUBE_API_KEY:
-            print("警告: YOUTUBE_API_KEYが設定されていません")
-            return False
-        
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-        print("YouTube API接続成功")
-        return True
-    except Exception as e:
-        print(f"YouTube API初期化エラー: {e}")
-        return False
-
-@app.on_event("startup")
-async def startup_event():
-    initialize_youtube_api()
-
-@app.get("/")
-def root():
-    """ルートエンドポイント"""
-    return {
-        "message": "YouTube マーケティング分析ツールへようこそ！",
-        "version": "1.0.0",
-        "endpoints": {
-            "/docs": "APIドキュメント",
-            "/search": "動画検索",
-            "/video/{video_id}": "動画詳細分析",
-            "/channel/{channel_id}": "チャンネル分析",
-            "/trending": "トレンド動画",
-            "/compare-channels": "チャンネル比較"
-        }
-    }
-
-@app.get("/search", response_model=List[VideoInfo])
-def search_videos(
-    keyword: str = Query(..., description="検索キーワード"),
-    max_results: int = Query(10, ge=1, le=50, description="取得件数"),
-    order: str = Query("relevance", description="並び順: relevance, date, rating, viewCount")
-):
-    """キーワードで動画を検索し、詳細情報を取得"""
-    
-    # ここに挿入！（この行の下に）
-    # 一時的なテストモード
-    if not youtube:
-        return [
-            VideoInfo(
-                video_id="test123",
-                title="Python プログラミング入門",
-                channel_id="ch123",
-                channel_title="テストチャンネル",
-                published_at="2024-01-01T00:00:00Z",
-                view_count=10000,
-                like_count=500,
-                comment_count=50,
-                duration="PT10M30S",
-                thumbnail_url="https://via.placeholder.com/320x180",
-                engagement_rate=5.5,
-                description="これはテストデータです..."
-            )
-        ]
-    
-    if not youtube:
-        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")    
-    try:
-        # 動画を検索
-        search_response = youtube.search().list(
-            q=keyword,
-            part='snippet',
-            type='video',
-            maxResults=max_results,
-            order=order
-        ).execute()
-        
-        video_ids = [item['id']['videoId'] for item in search_response['items']]
-        
-        # 動画の詳細情報を取得
-        videos_response = youtube.videos().list(
-            part='statistics,contentDetails,snippet',
-            id=','.join(video_ids)
-        ).execute()
-        
-        videos = []
-        for item in videos_response['items']:
-            stats = item['statistics']
-            snippet = item['snippet']
-            
-            # エンゲージメント率を計算
-            view_count = int(stats.get('viewCount', 0))
-            like_count = int(stats.get('likeCount', 0))
-            comment_count = int(stats.get('commentCount', 0))
-            
-            engagement_rate = 0
-            if view_count > 0:
-                engagement_rate = ((like_count + comment_count) / view_count) * 100
-            
-            video_info = VideoInfo(
-                video_id=item['id'],
-                title=snippet['title'],
-                channel_id=snippet['channelId'],
-                channel_title=snippet['channelTitle'],
-                published_at=snippet['publishedAt'],
-                view_count=view_count,
-                like_count=like_count,
-                comment_count=comment_count,
-                duration=item['contentDetails']['duration'],
-                thumbnail_url=snippet['thumbnails']['high']['url'],
-                engagement_rate=round(engagement_rate, 2),
-                description=snippet['description'][:200] + "..."
-            )
-            videos.append(video_info)
-        
-        return videos
-        
-    except HttpError as e:
-        raise HTTPException(status_code=e.resp.status, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/video/{video_id}")
-def analyze_video(video_id: str):
-    """特定の動画の詳細分析"""
-    
-    if not youtube:
-        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
-    
-    try:
-        # 動画情報を取得
-        video_response = youtube.videos().list(
-            part='statistics,contentDetails,snippet',
-            id=video_id
-        ).execute()
-        
-        if not video_response['items']:
-            raise HTTPException(status_code=404, detail="動画が見つかりません")
-        
-        item = video_response['items'][0]
-        stats = item['statistics']
-        snippet = item['snippet']
-        
-        # コメントの分析（最新10件）
-        comments = []
-        try:
-            comments_response = youtube.commentThreads().list(
-                part='snippet',
-                videoId=video_id,
-                maxResults=10,
-                order='relevance'
-            ).execute()
-            
-            for comment in comments_response['items']:
-                comments.append({
-                    'text': comment['snippet']['topLevelComment']['snippet']['textDisplay'],
-                    'likeCount': comment['snippet']['topLevelComment']['snippet']['likeCount'],
-                    'publishedAt': comment['snippet']['topLevelComment']['snippet']['publishedAt']
-                })
-        except:
-            comments = []
-        
-        # タグ分析
-        tags = snippet.get('tags', [])
-        
-        return {
-            'video_info': {
-                'title': snippet['title'],
-                'channel': snippet['channelTitle'],
-                'published_at': snippet['publishedAt'],
-                'description': snippet['description']
-            },
-            'statistics': {
-                'view_count': int(stats.get('viewCount', 0)),
-                'like_count': int(stats.get('likeCount', 0)),
-                'dislike_count': int(stats.get('dislikeCount', 0)),
-                'comment_count': int(stats.get('commentCount', 0)),
-                'engagement_rate': round(((int(stats.get('likeCount', 0)) + int(stats.get('commentCount', 0))) / int(stats.get('viewCount', 1))) * 100, 2)
-            },
-            'tags': tags[:10],
-            'top_comments': comments,
-            'content_details': {
-                'duration': item['contentDetails']['duration'],
-                'definition': item['contentDetails']['definition'],
-                'caption': item['contentDetails'].get('caption', 'false')
-            }
-        }
-        
-    except HttpError as e:
-        raise HTTPException(status_code=e.resp.status, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/channel/{channel_id}", response_model=ChannelInfo)
-def analyze_channel(channel_id: str):
-    """チャンネルの詳細分析"""
-    
-    if not youtube:
-        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
-    
-    try:
-        # チャンネル情報を取得
-        channel_response = youtube.channels().list(
-            part='statistics,snippet,contentDetails',
-            id=channel_id
-        ).execute()
-        
-        if not channel_response['items']:
-            raise HTTPException(status_code=404, detail="チャンネルが見つかりません")
-        
-        item = channel_response['items'][0]
-        stats = item['statistics']
-        snippet = item['snippet']
-        
-        # 平均視聴回数を計算
-        view_count = int(stats.get('viewCount', 0))
-        video_count = int(stats.get('videoCount', 1))
-        average_views = view_count / video_count if video_count > 0 else 0
-        
-        channel_info = ChannelInfo(
-            channel_id=channel_id,
-            title=snippet['title'],
-            description=snippet['description'][:200] + "..." if snippet['description'] else "",
-            subscriber_count=int(stats.get('subscriberCount', 0)),
-            video_count=video_count,
-            view_count=view_count,
-            published_at=snippet['publishedAt'],
-            thumbnail_url=snippet['thumbnails']['high']['url'],
-            average_views=round(average_views, 0)
-        )
-        
-        return channel_info
-        
-    except HttpError as e:
-        raise HTTPException(status_code=e.resp.status, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/trending")
-def get_trending_videos(
-    region_code: str = Query("JP", description="地域コード（JP=日本）"),
-    category_id: str = Query("0", description="カテゴリID（0=全て）"),
-    max_results: int = Query(10, ge=1, le=50)
-):
-    """トレンド動画を取得"""
-    
-    if not youtube:
-        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
-    
-    try:
-        # トレンド動画を取得
-        request = youtube.videos().list(
-            part='snippet,statistics',
-            chart='mostPopular',
-            regionCode=region_code,
-            maxResults=max_results
-        )
-        
-        if category_id != "0":
-            request = youtube.videos().list(
-                part='snippet,statistics',
-                chart='mostPopular',
-                regionCode=region_code,
-                videoCategoryId=category_id,
-                maxResults=max_results
-            )
-        
-        response = request.execute()
-        
-        trending_videos = []
-        for item in response['items']:
-            stats = item['statistics']
-            snippet = item['snippet']
-            
-            trending_videos.append({
-                'video_id': item['id'],
-                'title': snippet['title'],
-                'channel': snippet['channelTitle'],
-                'published_at': snippet['publishedAt'],
-                'view_count': int(stats.get('viewCount', 0)),
-                'like_count': int(stats.get('likeCount', 0)),
-                'thumbnail_url': snippet['thumbnails']['high']['url'],
-                'category': snippet.get('categoryId', 'N/A')
-            })
-        
-        return {
-            'region': region_code,
-            'total': len(trending_videos),
-            'videos': trending_videos
-        }
-        
-    except HttpError as e:
-        raise HTTPException(status_code=e.resp.status, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/compare-channels")
-def compare_channels(channel_ids: List[str] = Query(..., description="比較するチャンネルIDのリスト")):
-    """複数のチャンネルを比較分析"""
-    
-    if not youtube:
-        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
-    
-    if len(channel_ids) > 5:
-        raise HTTPException(status_code=400, detail="一度に比較できるチャンネルは5つまでです")
-    
-    try:
-        channels_data = []
-        
-        for channel_id in channel_ids:
-            channel_info = analyze_channel(channel_id)
-            channels_data.append(channel_info)
-        
-        # 比較メトリクスを計算
-        df = pd.DataFrame([c.dict() for c in channels_data])
-        
-        comparison_metrics = {
-            'average_metrics': {
-                'avg_subscribers': int(df['subscriber_count'].mean()),
-                'avg_videos': int(df['video_count'].mean()),
-                'avg_views': int(df['view_count'].mean()),
-                'avg_views_per_video': int(df['average_views'].mean())
-            },
-            'rankings': {
-                'by_subscribers': df.sort_values('subscriber_count', ascending=False)['title'].tolist(),
-                'by_total_views': df.sort_values('view_count', ascending=False)['title'].tolist(),
-                'by_avg_views': df.sort_values('average_views', ascending=False)['title'].tolist()
-            },
-            'growth_potential': []
-        }
-        
-        # 成長ポテンシャルを分析
-        for _, channel in df.iterrows():
-            if channel['subscriber_count'] > 0:
-                engagement_score = (channel['average_views'] / channel['subscriber_count']) * 100
-                comparison_metrics['growth_potential'].append({
-                    'channel': channel['title'],
-                    'engagement_score': round(engagement_score, 2),
-                    'rating': 'High' if engagement_score > 10 else 'Medium' if engagement_score > 5 else 'Low'
-                })
-        
-        return ChannelComparison(
-            channels=channels_data,
-            comparison_metrics=comparison_metrics
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/keyword-suggestions")
-def get_keyword_suggestions(
-    base_keyword: str = Query(..., description="基本キーワード"),
-    max_results: int = Query(20, ge=5, le=50)
-):
-    """関連キーワードの提案"""
-    
-    if not youtube:
-        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
-    
-    try:
-        # 基本キーワードで検索
-        search_response = youtube.search().list(
-            q=base_keyword,
-            part='snippet',
-            type='video',
-            maxResults=max_results
-        ).execute()
-        
-        # 関連キーワードを抽出
-        keywords = set()
-        keywords.add(base_keyword)
-        
-        for item in search_response['items']:
-            # タイトルからキーワードを抽出
-            title_words = item['snippet']['title'].lower().split()
-            for word in title_words:
-                if len(word) > 3 and word not in ['this', 'that', 'with', 'from']:
-                    keywords.add(word)
-            
-            # タグを追加
-            video_id = item['id']['videoId']
-            try:
-                video_response = youtube.videos().list(
-                    part='snippet',
-                    id=video_id
-                ).execute()
-                
-                if video_response['items']:
-                    tags = video_response['items'][0]['snippet'].get('tags', [])
-                    keywords.update(tags[:5])
-            except:
-                pass
-        
-        # キーワードの人気度を分析
-        keyword_analysis = []
-        for keyword in list(keywords)[:20]:
-            if keyword != base_keyword:
-                # 各キーワードの検索結果数を取得
-                try:
-                    search_count = youtube.search().list(
-                        q=keyword,
-                        part='id',
-                        type='video',
-                        maxResults=1
-                    ).execute()
-                    
-                    total_results = search_count.get('pageInfo', {}).get('totalResults', 0)
-                    keyword_analysis.append({
-                        'keyword': keyword,
-                        'search_volume': total_results,
-                        'relevance': 'High' if base_keyword.lower() in keyword.lower() else 'Medium'
-                    })
-                except:
-                    pass
-        
-        # 検索ボリュームでソート
-        keyword_analysis.sort(key=lambda x: x['search_volume'], reverse=True)
-        
-        return {
-            'base_keyword': base_keyword,
-            'suggestions': keyword_analysis[:15],
-            'total_found': len(keyword_analysis)
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-print("Debug: Reaching end of file")
-
-if __name__ == "__main__":
-    print("Debug: Starting server...")
-    import uvicorn
-    uvicorn.run("app:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+import os
+import re
+import asyncio
+import hashlib
+import httpx
+import numpy as np
+from cachetools import TTLCache
+import msgspec
+
+try:
+    # numbaがあればエンゲージメント計算カーネルをJITコンパイルする（任意依存）
+    from numba import njit
+except ImportError:
+    njit = None
+from typing import List, Dict, Optional, Any
+
+# 環境変数を読み込み
+load_dotenv()
+
+# YouTube API設定
+YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+YOUTUBE_API_BASE = "https://www.googleapis.com/youtube/v3"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時にHTTPクライアントを作成し、終了時にクローズする"""
+    if not YOUTUBE_API_KEY:
+        print("警告: YOUTUBE_API_KEYが設定されていません")
+    # 接続を使い回してTCP+TLSハンドシェイクを毎回払わない。HTTP/2で小さな
+    # リクエストを1本のコネクションに多重化する。timeoutを明示しないと
+    # httpxのデフォルト5秒が_YT_TIMEOUTより先に切れてしまう
+    app.state.http = httpx.AsyncClient(
+        base_url=YOUTUBE_API_BASE,
+        http2=True,
+        timeout=_YT_TIMEOUT,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+    # 初回リクエストがJITコンパイル代を払わないようにウォームアップ
+    _engagement_kernel(np.ones(1), np.ones(1), np.ones(1))
+    print("YouTube API接続準備完了")
+    yield
+    await app.state.http.aclose()
+
+app = FastAPI(
+    title="YouTube マーケティング分析ツール",
+    description="YouTubeの動画・チャンネル分析、競合分析、トレンド分析を行うツール",
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjsonはjson.dumpsより数倍速くbytesを直接返すので大きめのレスポンスで効く
+    default_response_class=ORJSONResponse
+)
+
+# CORS設定
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# /searchや/trendingの50件ページはJSONで50-100KBになるが、圧縮すると1/10程度に
+# 縮む。小さいレスポンスは圧縮コストの方が高いので1KB未満は素通しにする
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# ほぼ静的なエンドポイント（トレンドは数分、チャンネル統計は時間単位でしか変わらない）
+# にETagを付け、If-None-Matchが一致したらボディなしの304で応答する
+_ETAG_PREFIXES = ("/trending", "/channel/")
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    response = await call_next(request)
+
+    if (request.method != "GET"
+            or response.status_code != 200
+            or not request.url.path.startswith(_ETAG_PREFIXES)):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    # blake2bは現代のCPUではmd5より速い
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+    headers = dict(response.headers)
+    headers.pop("content-length", None)
+    headers["ETag"] = etag
+
+    if request.headers.get("if-none-match") == etag:
+        # 内側のレスポンスヘッダ（CORSやCache-Control）は304にも引き継ぐ。
+        # ETagだけにするとクロスオリジンの再検証がCORSチェックで落ちる
+        headers.pop("content-type", None)
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, status_code=200, headers=headers)
+
+# 同じ動画・チャンネル・トレンドへの問い合わせをAPIに繰り返さないためのTTLキャッシュ
+# （YouTubeクォータは1日10,000ユニット、検索1回100ユニットなのでヒット率がそのまま節約になる）
+CACHE_TTL = 300
+_yt_cache: TTLCache = TTLCache(maxsize=4096, ttl=CACHE_TTL)
+
+# アウトバウンド呼び出しの同時実行数を制限して、1リクエストのファンアウトが
+# YouTubeの秒間クォータを食い潰して403の連鎖を起こすのを防ぐ
+_YT_SEM = asyncio.Semaphore(int(os.getenv("YT_CONCURRENCY", "8")))
+_YT_TIMEOUT = 10
+_YT_MAX_RETRIES = 3
+
+async def yt_get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """YouTube Data API v3にGETリクエストを送信してJSONを返す
+
+    TTLキャッシュ・同時実行制限・タイムアウト付き。クォータ超過（403/429）は
+    指数バックオフで最大3回リトライする。
+    """
+    cache_key = (path, frozenset(params.items()))
+    cached = _yt_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    for retry in range(_YT_MAX_RETRIES + 1):
+        try:
+            async with _YT_SEM:
+                async with asyncio.timeout(_YT_TIMEOUT):
+                    resp = await app.state.http.get(
+                        f"/{path}", params={**params, "key": YOUTUBE_API_KEY}
+                    )
+        except (TimeoutError, httpx.TimeoutException):
+            # asyncio.timeoutの組み込みTimeoutErrorもhttpx側のタイムアウトも、
+            # エンドポイントのハンドラでは500になってしまうのでここで504に変換する
+            raise HTTPException(
+                status_code=504, detail="YouTube APIの応答がタイムアウトしました"
+            ) from None
+
+        retryable = resp.status_code == 429 or (
+            resp.status_code == 403 and "Exceeded" in resp.text
+        )
+        if retryable and retry < _YT_MAX_RETRIES:
+            await asyncio.sleep(2 ** retry)
+            continue
+
+        resp.raise_for_status()
+        break
+
+    data = resp.json()
+    _yt_cache[cache_key] = data
+    return data
+
+# キーワード抽出用: ストップワードはO(1)のハッシュ検索、トークン化は
+# C実装の正規表現1回の走査で済ませる（英字・ひらがな・カタカナ・漢字の4文字以上）
+_STOP = frozenset({
+    'this', 'that', 'with', 'from', 'have', 'what', 'your', 'will',
+    'about', 'when', 'them', 'these', 'into', 'then', 'than',
+    'こちら', 'これ', 'それ', 'ため', 'よう', 'こと', 'もの',
+})
+_TOKEN_RE = re.compile(r"[A-Za-z\u3040-\u30ff\u4e00-\u9fff]{4,}")
+
+def _engagement_kernel(views, likes, comments):
+    """エンゲージメント率 ((いいね+コメント)/視聴回数*100) をページ単位で一括計算"""
+    out = np.empty(views.shape)
+    for i in range(views.shape[0]):
+        if views[i] > 0:
+            out[i] = ((likes[i] + comments[i]) / views[i]) * 100.0
+        else:
+            out[i] = 0.0
+    return out
+
+if njit is not None:
+    _engagement_kernel = njit(cache=True, fastmath=True)(_engagement_kernel)
+
+# レスポンスモデル
+# YouTube APIのレスポンス形状は信頼できるので、ホットパスでのPydantic検証は
+# 省略してmsgspec.Struct（C実装のコンストラクタ+エンコーダ）で構築・直列化する
+class VideoInfo(msgspec.Struct):
+    video_id: str
+    title: str
+    channel_id: str
+    channel_title: str
+    published_at: str
+    view_count: int
+    like_count: int
+    comment_count: int
+    duration: str
+    duration_seconds: int
+    thumbnail_url: str
+    engagement_rate: float
+    description: str
+
+class ChannelInfo(msgspec.Struct):
+    channel_id: str
+    title: str
+    description: str
+    subscriber_count: int
+    video_count: int
+    view_count: int
+    published_at: str
+    thumbnail_url: str
+    average_views: float
+
+class ChannelComparison(msgspec.Struct):
+    channels: List[ChannelInfo]
+    comparison_metrics: Dict[str, Any]
+    missing: List[str] = []
+
+def _json_response(obj: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """msgspec.StructをそのままJSONバイト列にエンコードして返す"""
+    return Response(
+        content=msgspec.json.encode(obj),
+        media_type="application/json",
+        headers=headers
+    )
+
+# ISO-8601の動画長（PT1H2M3S等）を秒数へ。datetimeを経由せず整数演算だけで済ませる
+_DUR_RE = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
+
+def _duration_seconds(duration: str) -> int:
+    """ISO-8601表記の動画長を秒数に変換（ソート・フィルタ用）"""
+    m = _DUR_RE.match(duration)
+    if not m:
+        return 0
+    h, minutes, s = m.groups()
+    return int(h or 0) * 3600 + int(minutes or 0) * 60 + int(s or 0)
+
+def _build_video_info(item: Dict[str, Any], view_count: int, like_count: int,
+                      comment_count: int, engagement_rate: float) -> VideoInfo:
+    """videos.listの1件からVideoInfoを構築する
+
+    レスポンス形状は固定なので、ネストした辞書参照をローカル変数に束縛した
+    直列コードに特化させ、CPythonの適応的特殊化（PEP 659）が効くようにする。
+    """
+    s = item['snippet']
+    duration = item['contentDetails']['duration']
+    return VideoInfo(
+        video_id=item['id'],
+        title=s['title'],
+        channel_id=s['channelId'],
+        channel_title=s['channelTitle'],
+        published_at=s['publishedAt'],
+        view_count=view_count,
+        like_count=like_count,
+        comment_count=comment_count,
+        duration=duration,
+        duration_seconds=_duration_seconds(duration),
+        thumbnail_url=s['thumbnails']['high']['url'],
+        engagement_rate=round(float(engagement_rate), 2),
+        description=s['description'][:200] + "..."
+    )
+
+# channels.listで実際に使うフィールドだけをサーバ側で絞り込むマスク
+_CHANNEL_FIELDS = ("items(id,statistics(viewCount,videoCount,subscriberCount),"
+                   "snippet(title,description,publishedAt,thumbnails/high/url))")
+
+def _build_channel_info(item: Dict[str, Any]) -> ChannelInfo:
+    """channels.listのレスポンス1件からChannelInfoを構築"""
+    stats = item['statistics']
+    snippet = item['snippet']
+
+    # 平均視聴回数を計算
+    view_count = int(stats.get('viewCount', 0))
+    video_count = int(stats.get('videoCount', 1))
+    average_views = view_count / video_count if video_count > 0 else 0
+
+    return ChannelInfo(
+        channel_id=item['id'],
+        title=snippet['title'],
+        description=snippet['description'][:200] + "..." if snippet['description'] else "",
+        subscriber_count=int(stats.get('subscriberCount', 0)),
+        video_count=video_count,
+        view_count=view_count,
+        published_at=snippet['publishedAt'],
+        thumbnail_url=snippet['thumbnails']['high']['url'],
+        average_views=round(average_views, 0)
+    )
+
+@app.get("/")
+async def root():
+    """ルートエンドポイント"""
+    return {
+        "message": "YouTube マーケティング分析ツールへようこそ！",
+        "version": "1.0.0",
+        "endpoints": {
+            "/docs": "APIドキュメント",
+            "/search": "動画検索",
+            "/video/{video_id}": "動画詳細分析",
+            "/channel/{channel_id}": "チャンネル分析",
+            "/trending": "トレンド動画",
+            "/compare-channels": "チャンネル比較"
+        }
+    }
+
+@app.get("/search")
+async def search_videos(
+    keyword: str = Query(..., description="検索キーワード"),
+    max_results: int = Query(10, ge=1, le=50, description="取得件数"),
+    order: str = Query("relevance", description="並び順: relevance, date, rating, viewCount")
+):
+    """キーワードで動画を検索し、詳細情報を取得"""
+
+    # 一時的なテストモード
+    if not YOUTUBE_API_KEY:
+        return _json_response([
+            VideoInfo(
+                video_id="test123",
+                title="Python プログラミング入門",
+                channel_id="ch123",
+                channel_title="テストチャンネル",
+                published_at="2024-01-01T00:00:00Z",
+                view_count=10000,
+                like_count=500,
+                comment_count=50,
+                duration="PT10M30S",
+                duration_seconds=630,
+                thumbnail_url="https://via.placeholder.com/320x180",
+                engagement_rate=5.5,
+                description="これはテストデータです..."
+            )
+        ])
+
+    try:
+        # 動画を検索
+        search_response = await yt_get("search", {
+            "q": keyword,
+            "part": "snippet",
+            "type": "video",
+            "maxResults": max_results,
+            "order": order,
+            # 部分レスポンス: 使うのは動画IDだけなのでサーバ側で絞り込む
+            "fields": "items(id/videoId)"
+        })
+
+        video_ids = [item['id']['videoId'] for item in search_response['items']]
+
+        # 動画の詳細情報を取得
+        videos_response = await yt_get("videos", {
+            "part": "statistics,contentDetails,snippet",
+            "id": ','.join(video_ids),
+            "fields": "items(id,statistics(viewCount,likeCount,commentCount),"
+                      "contentDetails/duration,snippet(title,channelId,channelTitle,"
+                      "publishedAt,description,thumbnails/high/url))"
+        })
+
+        items = videos_response['items']
+
+        # エンゲージメント率をページ単位でまとめて計算
+        view_counts = [int(item['statistics'].get('viewCount', 0)) for item in items]
+        like_counts = [int(item['statistics'].get('likeCount', 0)) for item in items]
+        comment_counts = [int(item['statistics'].get('commentCount', 0)) for item in items]
+        engagement_rates = _engagement_kernel(
+            np.array(view_counts, dtype=np.float64),
+            np.array(like_counts, dtype=np.float64),
+            np.array(comment_counts, dtype=np.float64)
+        )
+
+        videos = [
+            _build_video_info(item, view_count, like_count, comment_count, engagement_rate)
+            for item, view_count, like_count, comment_count, engagement_rate in zip(
+                items, view_counts, like_counts, comment_counts, engagement_rates
+            )
+        ]
+
+        return _json_response(videos)
+
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/video/{video_id}")
+async def analyze_video(video_id: str):
+    """特定の動画の詳細分析"""
+
+    if not YOUTUBE_API_KEY:
+        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
+
+    try:
+        # 動画情報とコメントは独立しているので並列に取得
+        video_response, comments_response = await asyncio.gather(
+            yt_get("videos", {
+                "part": "statistics,contentDetails,snippet",
+                "id": video_id,
+                "fields": "items(id,statistics,contentDetails(duration,definition,caption),"
+                          "snippet(title,channelTitle,publishedAt,description,tags))"
+            }),
+            yt_get("commentThreads", {
+                "part": "snippet",
+                "videoId": video_id,
+                "maxResults": 10,
+                "order": "relevance",
+                "fields": "items(snippet/topLevelComment/snippet"
+                          "(textDisplay,likeCount,publishedAt))"
+            }),
+            return_exceptions=True
+        )
+
+        if isinstance(video_response, Exception):
+            raise video_response
+
+        if not video_response['items']:
+            raise HTTPException(status_code=404, detail="動画が見つかりません")
+
+        item = video_response['items'][0]
+        stats = item['statistics']
+        snippet = item['snippet']
+
+        # コメントの分析（最新10件）コメント無効の動画では取得失敗を無視
+        comments = []
+        if not isinstance(comments_response, Exception):
+            for comment in comments_response['items']:
+                comments.append({
+                    'text': comment['snippet']['topLevelComment']['snippet']['textDisplay'],
+                    'likeCount': comment['snippet']['topLevelComment']['snippet']['likeCount'],
+                    'publishedAt': comment['snippet']['topLevelComment']['snippet']['publishedAt']
+                })
+
+        # タグ分析
+        tags = snippet.get('tags', [])
+
+        return {
+            'video_info': {
+                'title': snippet['title'],
+                'channel': snippet['channelTitle'],
+                'published_at': snippet['publishedAt'],
+                'description': snippet['description']
+            },
+            'statistics': {
+                'view_count': int(stats.get('viewCount', 0)),
+                'like_count': int(stats.get('likeCount', 0)),
+                'dislike_count': int(stats.get('dislikeCount', 0)),
+                'comment_count': int(stats.get('commentCount', 0)),
+                'engagement_rate': round(((int(stats.get('likeCount', 0)) + int(stats.get('commentCount', 0))) / int(stats.get('viewCount', 1))) * 100, 2)
+            },
+            'tags': tags[:10],
+            'top_comments': comments,
+            'content_details': {
+                'duration': item['contentDetails']['duration'],
+                'definition': item['contentDetails']['definition'],
+                'caption': item['contentDetails'].get('caption', 'false')
+            }
+        }
+
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/channel/{channel_id}")
+async def analyze_channel(channel_id: str):
+    """チャンネルの詳細分析"""
+
+    if not YOUTUBE_API_KEY:
+        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
+
+    try:
+        # チャンネル情報を取得
+        channel_response = await yt_get("channels", {
+            "part": "statistics,snippet,contentDetails",
+            "id": channel_id,
+            "fields": _CHANNEL_FIELDS
+        })
+
+        if not channel_response['items']:
+            raise HTTPException(status_code=404, detail="チャンネルが見つかりません")
+
+        # キャッシュ済みレスポンスはCDN・ブラウザ側でも再利用できる
+        return _json_response(
+            _build_channel_info(channel_response['items'][0]),
+            headers={"Cache-Control": f"public, max-age={CACHE_TTL}"}
+        )
+
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/trending")
+async def get_trending_videos(
+    response: Response,
+    region_code: str = Query("JP", description="地域コード（JP=日本）"),
+    category_id: str = Query("0", description="カテゴリID（0=全て）"),
+    max_results: int = Query(10, ge=1, le=50)
+):
+    """トレンド動画を取得"""
+
+    response.headers["Cache-Control"] = f"public, max-age={CACHE_TTL}"
+
+    if not YOUTUBE_API_KEY:
+        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
+
+    try:
+        # トレンド動画を取得
+        params = {
+            "part": "snippet,statistics",
+            "chart": "mostPopular",
+            "regionCode": region_code,
+            "maxResults": max_results,
+            "fields": "items(id,statistics(viewCount,likeCount),"
+                      "snippet(title,channelTitle,publishedAt,categoryId,"
+                      "thumbnails/high/url))"
+        }
+
+        if category_id != "0":
+            params["videoCategoryId"] = category_id
+
+        data = await yt_get("videos", params)
+
+        trending_videos = []
+        for item in data['items']:
+            stats = item['statistics']
+            snippet = item['snippet']
+
+            trending_videos.append({
+                'video_id': item['id'],
+                'title': snippet['title'],
+                'channel': snippet['channelTitle'],
+                'published_at': snippet['publishedAt'],
+                'view_count': int(stats.get('viewCount', 0)),
+                'like_count': int(stats.get('likeCount', 0)),
+                'thumbnail_url': snippet['thumbnails']['high']['url'],
+                'category': snippet.get('categoryId', 'N/A')
+            })
+
+        return {
+            'region': region_code,
+            'total': len(trending_videos),
+            'videos': trending_videos
+        }
+
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/compare-channels")
+async def compare_channels(channel_ids: List[str] = Query(..., description="比較するチャンネルIDのリスト")):
+    """複数のチャンネルを比較分析"""
+
+    if not YOUTUBE_API_KEY:
+        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
+
+    if len(channel_ids) > 5:
+        raise HTTPException(status_code=400, detail="一度に比較できるチャンネルは5つまでです")
+
+    try:
+        # channels.listはIDをカンマ区切りで最大50件まとめて受け付けるので1回で取得
+        channels_response = await yt_get("channels", {
+            "part": "statistics,snippet,contentDetails",
+            "id": ','.join(channel_ids),
+            "fields": _CHANNEL_FIELDS
+        })
+
+        # APIはレスポンス順を保証しないので、入力順に並べ直し、見つからなかった
+        # IDはエラーにせずmissingとして返す
+        by_id = {item['id']: item for item in channels_response['items']}
+        channels_data = [_build_channel_info(by_id[cid]) for cid in channel_ids if cid in by_id]
+        missing = [cid for cid in channel_ids if cid not in by_id]
+
+        if not channels_data:
+            raise HTTPException(status_code=404, detail="チャンネルが見つかりません")
+
+        # メトリクス計算はイベントループ外のワーカースレッドで実行し、
+        # 今後集計が重くなっても他リクエストの受付を止めないようにする
+        comparison_metrics = await asyncio.to_thread(
+            _compute_comparison_metrics, channels_data
+        )
+
+        return _json_response(ChannelComparison(
+            channels=channels_data,
+            comparison_metrics=comparison_metrics,
+            missing=missing
+        ))
+
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _compute_comparison_metrics(channels_data: List[ChannelInfo]) -> Dict[str, Any]:
+    """チャンネル比較メトリクスを計算する（イベントループに依存しない純関数）"""
+    n = len(channels_data)
+    comparison_metrics = {
+        'average_metrics': {
+            'avg_subscribers': sum(c.subscriber_count for c in channels_data) // n,
+            'avg_videos': sum(c.video_count for c in channels_data) // n,
+            'avg_views': sum(c.view_count for c in channels_data) // n,
+            'avg_views_per_video': int(sum(c.average_views for c in channels_data) / n)
+        },
+        'rankings': {
+            'by_subscribers': [c.title for c in sorted(channels_data, key=lambda c: c.subscriber_count, reverse=True)],
+            'by_total_views': [c.title for c in sorted(channels_data, key=lambda c: c.view_count, reverse=True)],
+            'by_avg_views': [c.title for c in sorted(channels_data, key=lambda c: c.average_views, reverse=True)]
+        },
+        'growth_potential': []
+    }
+
+    # 成長ポテンシャルを分析
+    for channel in channels_data:
+        if channel.subscriber_count > 0:
+            engagement_score = (channel.average_views / channel.subscriber_count) * 100
+            comparison_metrics['growth_potential'].append({
+                'channel': channel.title,
+                'engagement_score': round(engagement_score, 2),
+                'rating': 'High' if engagement_score > 10 else 'Medium' if engagement_score > 5 else 'Low'
+            })
+
+    return comparison_metrics
+
+@app.get("/keyword-suggestions")
+async def get_keyword_suggestions(
+    base_keyword: str = Query(..., description="基本キーワード"),
+    max_results: int = Query(20, ge=5, le=50)
+):
+    """関連キーワードの提案"""
+
+    if not YOUTUBE_API_KEY:
+        raise HTTPException(status_code=503, detail="YouTube APIが利用できません")
+
+    try:
+        # 基本キーワードで検索
+        search_response = await yt_get("search", {
+            "q": base_keyword,
+            "part": "snippet",
+            "type": "video",
+            "maxResults": max_results,
+            "fields": "items(id/videoId,snippet/title)"
+        })
+
+        # 関連キーワードを抽出
+        keywords = set()
+        keywords.add(base_keyword)
+
+        for item in search_response['items']:
+            # タイトルからキーワードを抽出
+            for word in _TOKEN_RE.findall(item['snippet']['title'].lower()):
+                if word not in _STOP:
+                    keywords.add(word)
+
+        # タグは動画IDをまとめて1回のvideos.listで取得（1件ずつのN+1呼び出しを排除）
+        video_ids = [item['id']['videoId'] for item in search_response['items']]
+        if video_ids:
+            videos_response = await yt_get("videos", {
+                "part": "snippet",
+                "id": ','.join(video_ids),
+                "fields": "items(snippet/tags)"
+            })
+            for item in videos_response['items']:
+                tags = item['snippet'].get('tags', [])
+                keywords.update(tags[:5])
+
+        # キーワードの人気度を分析（同時実行数はyt_get側のセマフォが制限する）
+        target_keywords = [k for k in list(keywords)[:20] if k != base_keyword]
+        search_counts = await asyncio.gather(
+            *[yt_get("search", {
+                "q": keyword,
+                "part": "id",
+                "type": "video",
+                "maxResults": 1,
+                "fields": "pageInfo/totalResults"
+            }) for keyword in target_keywords],
+            return_exceptions=True
+        )
+
+        keyword_analysis = []
+        for keyword, search_count in zip(target_keywords, search_counts):
+            if isinstance(search_count, Exception):
+                continue
+            total_results = search_count.get('pageInfo', {}).get('totalResults', 0)
+            keyword_analysis.append({
+                'keyword': keyword,
+                'search_volume': total_results,
+                'relevance': 'High' if base_keyword.lower() in keyword.lower() else 'Medium'
+            })
+
+        # 検索ボリュームでソート
+        keyword_analysis.sort(key=lambda x: x['search_volume'], reverse=True)
+
+        return {
+            'base_keyword': base_keyword,
+            'suggestions': keyword_analysis[:15],
+            'total_found': len(keyword_analysis)
+        }
+
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+if __name__ == "__main__":
+    import uvicorn
+
+    if os.getenv("DEV"):
+        # 開発用: オートリロード付きシングルワーカー
+        uvicorn.run("app:app", host="127.0.0.1", port=8000, reload=True)
+    else:
+        # 本番用: ワーカー多重化 + uvloop + C実装HTTPパーサ（httptools）。
+        # アクセスログはリクエスト毎の同期I/Oになるので無効化する
+        uvicorn.run(
+            "app:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=2 * (os.cpu_count() or 1) + 1,
+            loop="uvloop",
+            http="httptools",
+            access_log=False
+        )
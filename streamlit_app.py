@@ -1,758 +1,991 @@
-import streamlit as st
-import pandas as pd
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from dotenv import load_dotenv
-import os
-from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-
-# ページ設定
-st.set_page_config(
-    page_title="YouTube マーケティング分析ツール",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# 環境変数を読み込み
-load_dotenv()
-
-# スタイル設定
-st.markdown("""
-    <style>
-    .main-header {
-        font-size: 3rem;
-        color: #FF0000;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .metric-card {
-        background-color: #f0f2f6;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        text-align: center;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# YouTube API設定
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-
-@st.cache_resource
-def init_youtube_api():
-    """YouTube APIクライアントを初期化"""
-    try:
-        if not YOUTUBE_API_KEY:
-            st.error("YouTube APIキーが設定されていません。.envファイルを確認してください。")
-            return None
-        return build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-    except Exception as e:
-        st.error(f"YouTube API初期化エラー: {e}")
-        return None
-
-# APIクライアントを初期化
-youtube = init_youtube_api()
-
-# タイトル
-st.markdown('<h1 class="main-header">📺 YouTube マーケティング分析ツール</h1>', unsafe_allow_html=True)
-
-# サイドバー
-st.sidebar.title("🎯 分析メニュー")
-analysis_type = st.sidebar.selectbox(
-    "分析タイプを選択",
-    ["動画検索・分析", "チャンネル分析", "トレンド分析", "競合分析", "キーワード分析"]
-)
-
-# メイン関数
-def search_videos(keyword, max_results=10, order="relevance"):
-    """動画を検索して詳細情報を取得"""
-    
-    # YouTubeAPIが初期化されているかチェック
-    if not youtube:
-        st.error("YouTube APIが初期化されていません。APIキーを確認してください。")
-        return pd.DataFrame()
-    
-    try:
-        # 動画を検索
-        search_response = youtube.search().list(
-            q=keyword,
-            part='snippet',
-            type='video',
-            maxResults=max_results,
-            order=order
-        ).execute()
-        
-        # レスポンスの検証
-        if 'items' not in search_response or not search_response['items']:
-            st.warning("検索結果が見つかりませんでした。")
-            return pd.DataFrame()
-        
-        video_ids = [item['id']['videoId'] for item in search_response['items']]
-        
-        # 動画の詳細情報を取得
-        videos_response = youtube.videos().list(
-            part='statistics,contentDetails,snippet',
-            id=','.join(video_ids)
-        ).execute()
-        
-        # レスポンスの検証
-        if 'items' not in videos_response or not videos_response['items']:
-            st.warning("動画の詳細情報を取得できませんでした。")
-            return pd.DataFrame()
-        
-        videos_data = []
-        for item in videos_response['items']:
-            stats = item.get('statistics', {})
-            snippet = item.get('snippet', {})
-            
-            # エンゲージメント率を計算
-            view_count = int(stats.get('viewCount', 0))
-            like_count = int(stats.get('likeCount', 0))
-            comment_count = int(stats.get('commentCount', 0))
-            
-            engagement_rate = 0
-            if view_count > 0:
-                engagement_rate = ((like_count + comment_count) / view_count) * 100
-            
-            # サムネイルURLの安全な取得
-            thumbnail_url = ""
-            if 'thumbnails' in snippet and 'medium' in snippet['thumbnails']:
-                thumbnail_url = snippet['thumbnails']['medium']['url']
-            
-            videos_data.append({
-                'タイトル': snippet.get('title', 'タイトル不明'),
-                'チャンネル': snippet.get('channelTitle', 'チャンネル不明'),
-                '公開日': snippet.get('publishedAt', '')[:10] if snippet.get('publishedAt') else '',
-                '視聴回数': view_count,
-                'いいね数': like_count,
-                'コメント数': comment_count,
-                'エンゲージメント率': round(engagement_rate, 2),
-                '動画ID': item.get('id', ''),
-                'サムネイル': thumbnail_url
-            })
-        
-        return pd.DataFrame(videos_data)
-    
-    except HttpError as e:
-        st.error(f"APIエラー: {e}")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"予期しないエラーが発生しました: {e}")
-        return pd.DataFrame()
-
-def get_channel_id_from_handle(handle):
-    """YouTubeハンドル（@username）から直接チャンネルIDを取得する代替方法"""
-    try:
-        # ハンドルベースの検索を試行
-        # まず channels().list() で forHandle パラメータを使用（新しいAPI機能）
-        try:
-            response = youtube.channels().list(
-                part='id,snippet',
-                forHandle=handle.replace('@', '')
-            ).execute()
-            
-            if 'items' in response and response['items']:
-                return response['items'][0]['id']
-        except:
-            # forHandle が利用できない場合はスキップ
-            pass
-        
-        # 検索APIを使用
-        search_queries = [
-            f'"{handle}"',
-            f'"{handle.replace("@", "")}"',
-            handle.replace('@', ''),
-            handle.replace('@', '').replace('_', ' ')
-        ]
-        
-        for query in search_queries:
-            try:
-                search_response = youtube.search().list(
-                    q=query,
-                    part='snippet',
-                    type='channel',
-                    maxResults=10
-                ).execute()
-                
-                if 'items' in search_response and search_response['items']:
-                    # より厳密なマッチングを試行
-                    handle_clean = handle.replace('@', '').lower()
-                    
-                    for item in search_response['items']:
-                        channel_title = item['snippet']['channelTitle'].lower()
-                        
-                        # 様々なマッチングパターンを試行
-                        if (handle_clean in channel_title or
-                            channel_title.replace(' ', '_') == handle_clean or
-                            channel_title.replace(' ', '') == handle_clean or
-                            handle_clean.replace('_', ' ') in channel_title):
-                            return item['snippet']['channelId']
-                    
-                    # 完全マッチがない場合は最初の結果を返す
-                    return search_response['items'][0]['snippet']['channelId']
-                        
-            except Exception as e:
-                st.write(f"検索クエリ '{query}' でエラー: {e}")
-                continue
-        
-        return None
-        
-    except Exception as e:
-        st.error(f"ハンドル検索エラー: {e}")
-        return None
-
-def get_channel_id_from_input(channel_input):
-    """様々な形式の入力からチャンネルIDを取得"""
-    if not youtube:
-        return None
-    
-    try:
-        # 既にチャンネルIDの場合（UCで始まる24文字）
-        if channel_input.startswith('UC') and len(channel_input) == 24:
-            return channel_input
-        
-        # カスタムURL（@ユーザー名）の場合
-        if '@' in channel_input:
-            # @ユーザー名の部分を抽出
-            if 'youtube.com/@' in channel_input:
-                handle = '@' + channel_input.split('/@')[1].split('/')[0]
-            else:
-                handle = channel_input if channel_input.startswith('@') else '@' + channel_input
-            
-            st.info(f"検索中のハンドル: {handle}")
-            
-            # 新しいハンドル検索方法を使用
-            channel_id = get_channel_id_from_handle(handle)
-            if channel_id:
-                return channel_id
-            
-            # 従来の検索方法も試行
-            username = handle.replace('@', '')
-            st.info(f"従来の検索方法でユーザー名を検索: {username}")
-            
-            search_response = youtube.search().list(
-                q=username,
-                part='snippet',
-                type='channel',
-                maxResults=10
-            ).execute()
-            
-            st.write(f"検索結果数: {len(search_response.get('items', []))}")
-            
-            # デバッグ情報を表示
-            if 'items' in search_response and search_response['items']:
-                st.write("見つかったチャンネル:")
-                for i, item in enumerate(search_response['items']):
-                    channel_title = item['snippet']['channelTitle']
-                    channel_id = item['snippet']['channelId']
-                    st.write(f"{i+1}. {channel_title} (ID: {channel_id})")
-                
-                return search_response['items'][0]['snippet']['channelId']
-        
-        # youtube.com/channel/形式
-        elif 'youtube.com/channel/' in channel_input:
-            return channel_input.split('channel/')[1].split('/')[0]
-        
-        # youtube.com/c/形式またはyoutube.com/user/形式
-        elif 'youtube.com/c/' in channel_input or 'youtube.com/user/' in channel_input:
-            if 'youtube.com/c/' in channel_input:
-                username = channel_input.split('/c/')[1].split('/')[0]
-            else:
-                username = channel_input.split('/user/')[1].split('/')[0]
-            
-            # チャンネル名で検索
-            search_response = youtube.search().list(
-                q=username,
-                part='snippet',
-                type='channel',
-                maxResults=5
-            ).execute()
-            
-            if 'items' in search_response and search_response['items']:
-                return search_response['items'][0]['snippet']['channelId']
-        
-        # それ以外の場合は検索で試行
-        else:
-            search_response = youtube.search().list(
-                q=channel_input,
-                part='snippet',
-                type='channel',
-                maxResults=5
-            ).execute()
-            
-            if 'items' in search_response and search_response['items']:
-                return search_response['items'][0]['snippet']['channelId']
-        
-        return None
-        
-    except Exception as e:
-        st.error(f"チャンネルID取得エラー: {e}")
-        st.write(f"エラー詳細: {str(e)}")
-        return None
-
-def analyze_channel(channel_id):
-    """チャンネルの詳細分析"""
-    
-    # YouTubeAPIが初期化されているかチェック
-    if not youtube:
-        st.error("YouTube APIが初期化されていません。APIキーを確認してください。")
-        return None, pd.DataFrame()
-    
-    try:
-        # チャンネル情報を取得
-        channel_response = youtube.channels().list(
-            part='statistics,snippet,contentDetails',
-            id=channel_id
-        ).execute()
-        
-        # レスポンスの検証を強化
-        if not channel_response or 'items' not in channel_response or not channel_response['items']:
-            st.error("チャンネルが見つかりません。チャンネルIDを確認してください。")
-            return None, pd.DataFrame()
-        
-        item = channel_response['items'][0]
-        stats = item.get('statistics', {})
-        snippet = item.get('snippet', {})
-        content_details = item.get('contentDetails', {})
-        
-        # サムネイルURLの安全な取得
-        thumbnail_url = ""
-        if 'thumbnails' in snippet and 'high' in snippet['thumbnails']:
-            thumbnail_url = snippet['thumbnails']['high']['url']
-        
-        channel_data = {
-            'チャンネル名': snippet.get('title', 'チャンネル名不明'),
-            '登録者数': int(stats.get('subscriberCount', 0)),
-            '動画本数': int(stats.get('videoCount', 0)),
-            '総視聴回数': int(stats.get('viewCount', 0)),
-            '開設日': snippet.get('publishedAt', '')[:10] if snippet.get('publishedAt') else '',
-            '説明': (snippet.get('description', '')[:200] + "...") if snippet.get('description') else "説明なし",
-            'サムネイル': thumbnail_url
-        }
-        
-        # 最新動画を取得
-        recent_videos = pd.DataFrame()
-        
-        if 'relatedPlaylists' in content_details and 'uploads' in content_details['relatedPlaylists']:
-            playlist_id = content_details['relatedPlaylists']['uploads']
-            
-            try:
-                playlist_response = youtube.playlistItems().list(
-                    part='snippet',
-                    playlistId=playlist_id,
-                    maxResults=10
-                ).execute()
-                
-                if 'items' in playlist_response and playlist_response['items']:
-                    recent_videos_data = []
-                    for video in playlist_response['items']:
-                        video_snippet = video.get('snippet', {})
-                        recent_videos_data.append({
-                            'タイトル': video_snippet.get('title', 'タイトル不明'),
-                            '公開日': video_snippet.get('publishedAt', '')[:10] if video_snippet.get('publishedAt') else ''
-                        })
-                    recent_videos = pd.DataFrame(recent_videos_data)
-            except HttpError as e:
-                st.warning(f"最新動画の取得に失敗しました: {e}")
-        
-        return channel_data, recent_videos
-    
-    except HttpError as e:
-        st.error(f"APIエラー: {e}")
-        return None, pd.DataFrame()
-    except Exception as e:
-        st.error(f"予期しないエラーが発生しました: {e}")
-        return None, pd.DataFrame()
-
-# メインコンテンツ
-if analysis_type == "動画検索・分析":
-    st.header("🔍 動画検索・分析")
-    
-    col1, col2, col3 = st.columns([3, 1, 1])
-    with col1:
-        keyword = st.text_input("検索キーワード", placeholder="例: Python プログラミング")
-    with col2:
-        max_results = st.number_input("取得件数", min_value=1, max_value=50, value=10)
-    with col3:
-        order = st.selectbox("並び順", ["relevance", "date", "viewCount", "rating"])
-    
-    if st.button("検索", type="primary", use_container_width=True):
-        if keyword:
-            with st.spinner("検索中..."):
-                df = search_videos(keyword, max_results, order)
-                
-            if not df.empty:
-                # メトリクスの表示
-                st.subheader("📊 検索結果の統計")
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric("検索結果数", f"{len(df)}件")
-                with col2:
-                    st.metric("平均視聴回数", f"{df['視聴回数'].mean():,.0f}回")
-                with col3:
-                    st.metric("平均エンゲージメント率", f"{df['エンゲージメント率'].mean():.2f}%")
-                with col4:
-                    st.metric("総視聴回数", f"{df['視聴回数'].sum():,.0f}回")
-                
-                # グラフ表示
-                st.subheader("📈 視聴回数とエンゲージメント率の関係")
-                fig = px.scatter(df, 
-                    x='視聴回数', 
-                    y='エンゲージメント率',
-                    size='いいね数',
-                    hover_data=['タイトル', 'チャンネル'],
-                    color='エンゲージメント率',
-                    color_continuous_scale='Reds'
-                )
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # 動画リスト
-                st.subheader("🎥 動画一覧")
-                for idx, row in df.iterrows():
-                    col1, col2 = st.columns([1, 4])
-                    with col1:
-                        if row['サムネイル']:
-                            st.image(row['サムネイル'], width=200)
-                    with col2:
-                        st.markdown(f"### {row['タイトル']}")
-                        st.text(f"チャンネル: {row['チャンネル']} | 公開日: {row['公開日']}")
-                        
-                        col_a, col_b, col_c, col_d = st.columns(4)
-                        with col_a:
-                            st.metric("視聴回数", f"{row['視聴回数']:,}")
-                        with col_b:
-                            st.metric("いいね数", f"{row['いいね数']:,}")
-                        with col_c:
-                            st.metric("コメント数", f"{row['コメント数']:,}")
-                        with col_d:
-                            st.metric("エンゲージメント率", f"{row['エンゲージメント率']}%")
-                        
-                        if row['動画ID']:
-                            st.markdown(f"[YouTubeで見る](https://youtube.com/watch?v={row['動画ID']})")
-                    st.divider()
-        else:
-            st.warning("検索キーワードを入力してください")
-
-elif analysis_type == "チャンネル分析":
-    st.header("📺 チャンネル分析")
-    
-    channel_input = st.text_input(
-        "チャンネルID、カスタムURL、またはチャンネル名", 
-        placeholder="例: @The_FirstTake, UCNtZPzvkjjB3EuPMNY71cmA, または First Take"
-    )
-    
-    if st.button("分析", type="primary", use_container_width=True):
-        if channel_input:
-            with st.spinner("チャンネルIDを取得中..."):
-                channel_id = get_channel_id_from_input(channel_input)
-                
-            if channel_id:
-                st.success(f"チャンネルID: {channel_id}")
-                with st.spinner("分析中..."):
-                    channel_data, recent_videos = analyze_channel(channel_id)
-                    
-                if channel_data:
-                    col1, col2 = st.columns([1, 3])
-                    with col1:
-                        if channel_data['サムネイル']:
-                            st.image(channel_data['サムネイル'])
-                    with col2:
-                        st.title(channel_data['チャンネル名'])
-                        st.text(f"開設日: {channel_data['開設日']}")
-                    
-                    # メトリクス
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("登録者数", f"{channel_data['登録者数']:,}")
-                    with col2:
-                        st.metric("動画本数", f"{channel_data['動画本数']:,}")
-                    with col3:
-                        st.metric("総視聴回数", f"{channel_data['総視聴回数']:,}")
-                    with col4:
-                        avg_views = channel_data['総視聴回数'] / max(channel_data['動画本数'], 1)
-                        st.metric("平均視聴回数", f"{avg_views:,.0f}")
-                    
-                    # 説明
-                    st.subheader("📝 チャンネル説明")
-                    st.text(channel_data['説明'])
-                    
-                    # 最新動画
-                    if not recent_videos.empty:
-                        st.subheader("🎬 最新動画")
-                        st.dataframe(recent_videos, use_container_width=True)
-            else:
-                st.error("チャンネルが見つかりませんでした。入力内容を確認してください。")
-        else:
-            st.warning("チャンネル情報を入力してください")
-
-elif analysis_type == "トレンド分析":
-    st.header("🔥 トレンド分析")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        region = st.selectbox("地域", ["JP", "US", "GB", "KR", "IN"])
-    with col2:
-        category = st.selectbox(
-            "カテゴリ",
-            ["0 - すべて", "10 - 音楽", "20 - ゲーム", "22 - ブログ", "23 - コメディ", "24 - エンターテイメント"]
-        )
-    with col3:
-        max_results = st.number_input("取得件数", min_value=1, max_value=50, value=10)
-    
-    if st.button("トレンドを取得", type="primary", use_container_width=True):
-        if not youtube:
-            st.error("YouTube APIが初期化されていません。")
-        else:
-            with st.spinner("取得中..."):
-                try:
-                    category_id = category.split(" - ")[0]
-                    
-                    request_params = {
-                        'part': 'snippet,statistics',
-                        'chart': 'mostPopular',
-                        'regionCode': region,
-                        'maxResults': max_results
-                    }
-                    
-                    if category_id != "0":
-                        request_params['videoCategoryId'] = category_id
-                    
-                    response = youtube.videos().list(**request_params).execute()
-                    
-                    # レスポンスの検証
-                    if 'items' not in response or not response['items']:
-                        st.warning("トレンド動画が見つかりませんでした。")
-                    else:
-                        trending_data = []
-                        for item in response['items']:
-                            stats = item.get('statistics', {})
-                            snippet = item.get('snippet', {})
-                            
-                            # サムネイルURLの安全な取得
-                            thumbnail_url = ""
-                            if 'thumbnails' in snippet and 'medium' in snippet['thumbnails']:
-                                thumbnail_url = snippet['thumbnails']['medium']['url']
-                            
-                            trending_data.append({
-                                'タイトル': snippet.get('title', 'タイトル不明'),
-                                'チャンネル': snippet.get('channelTitle', 'チャンネル不明'),
-                                '視聴回数': int(stats.get('viewCount', 0)),
-                                'いいね数': int(stats.get('likeCount', 0)),
-                                'サムネイル': thumbnail_url,
-                                '動画ID': item.get('id', '')
-                            })
-                        
-                        df = pd.DataFrame(trending_data)
-                        
-                        if not df.empty:
-                            # グラフ表示
-                            st.subheader("📊 トレンド動画の視聴回数")
-                            fig = px.bar(df.head(10), 
-                                x='タイトル', 
-                                y='視聴回数',
-                                color='視聴回数',
-                                color_continuous_scale='Reds'
-                            )
-                            fig.update_xaxes(tickangle=-45)
-                            fig.update_layout(height=500)
-                            st.plotly_chart(fig, use_container_width=True)
-                            
-                            # 動画リスト
-                            st.subheader("🎥 トレンド動画")
-                            for i, (_, row) in enumerate(df.iterrows(), start=1):
-                                col1, col2 = st.columns([1, 4])
-                                with col1:
-                                    if row['サムネイル']:
-                                        st.image(row['サムネイル'], width=200)
-                                with col2:
-                                    st.markdown(f"### {i}. {row['タイトル']}")
-                                    st.text(f"チャンネル: {row['チャンネル']}")
-                                    col_a, col_b = st.columns(2)
-                                    with col_a:
-                                        st.metric("視聴回数", f"{row['視聴回数']:,}")
-                                    with col_b:
-                                        st.metric("いいね数", f"{row['いいね数']:,}")
-                                    if row['動画ID']:
-                                        st.markdown(f"[YouTubeで見る](https://youtube.com/watch?v={row['動画ID']})")
-                                st.divider()
-                                
-                except HttpError as e:
-                    st.error(f"APIエラー: {e}")
-                except Exception as e:
-                    st.error(f"予期しないエラーが発生しました: {e}")
-
-elif analysis_type == "競合分析":
-    st.header("⚔️ 競合チャンネル分析")
-    
-    st.info("複数のチャンネルを比較分析します（最大5つまで）")
-    
-    channels = []
-    for i in range(5):
-        channel = st.text_input(f"チャンネル情報 {i+1} (ID、@ユーザー名、またはチャンネル名)", key=f"channel_{i}")
-        if channel:
-            channels.append(channel)
-    
-    if st.button("比較分析", type="primary", use_container_width=True) and channels:
-        if not youtube:
-            st.error("YouTube APIが初期化されていません。")
-        else:
-            with st.spinner("分析中..."):
-                comparison_data = []
-                
-                for channel_id in channels:
-                    try:
-                        # まずチャンネルIDを正しく取得
-                        actual_channel_id = get_channel_id_from_input(channel_id)
-                        
-                        if actual_channel_id:
-                            channel_response = youtube.channels().list(
-                                part='statistics,snippet',
-                                id=actual_channel_id
-                            ).execute()
-                            
-                            if channel_response and 'items' in channel_response and channel_response['items']:
-                                item = channel_response['items'][0]
-                                stats = item.get('statistics', {})
-                                snippet = item.get('snippet', {})
-                                
-                                video_count = max(int(stats.get('videoCount', 1)), 1)  # ゼロ除算を防ぐ
-                                
-                                comparison_data.append({
-                                    'チャンネル名': snippet.get('title', 'チャンネル名不明'),
-                                    '登録者数': int(stats.get('subscriberCount', 0)),
-                                    '動画本数': int(stats.get('videoCount', 0)),
-                                    '総視聴回数': int(stats.get('viewCount', 0)),
-                                    '平均視聴回数': int(stats.get('viewCount', 0)) / video_count
-                                })
-                        else:
-                            st.warning(f"チャンネル '{channel_id}' が見つかりませんでした。")
-                    except Exception as e:
-                        st.warning(f"チャンネル '{channel_id}' の取得に失敗しました: {e}")
-                
-                if comparison_data:
-                    df = pd.DataFrame(comparison_data)
-                    
-                    # レーダーチャート
-                    st.subheader("📊 総合比較")
-                    
-                    # 正規化
-                    df_normalized = df.copy()
-                    for col in ['登録者数', '動画本数', '総視聴回数', '平均視聴回数']:
-                        max_val = df[col].max()
-                        if max_val > 0:
-                            df_normalized[col] = (df[col] / max_val) * 100
-                    
-                    fig = go.Figure()
-                    
-                    for _, row in df_normalized.iterrows():
-                        values = row[['登録者数', '動画本数', '総視聴回数', '平均視聴回数']].tolist()
-                        values.append(values[0])  # 最初の値を追加してループを閉じる
-                        
-                        fig.add_trace(
-                            go.Scatterpolar(
-                                r=values,
-                                theta=['登録者数', '動画本数', '総視聴回数', '平均視聴回数', '登録者数'],
-                                fill='toself',
-                                name=row['チャンネル名']
-                            )
-                        )
-                    
-                    fig.update_layout(
-                        polar=dict(
-                            radialaxis=dict(
-                                visible=True,
-                                range=[0, 100]
-                            )),
-                        showlegend=True,
-                        height=500
-                    )
-                    
-                    st.plotly_chart(fig, use_container_width=True)
-                    
-                    # 詳細テーブル
-                    st.subheader("📋 詳細データ")
-                    st.dataframe(df.style.format({
-                        '登録者数': '{:,}',
-                        '動画本数': '{:,}',
-                        '総視聴回数': '{:,}',
-                        '平均視聴回数': '{:,.0f}'
-                    }), use_container_width=True)
-                else:
-                    st.error("チャンネルデータを取得できませんでした。チャンネルIDを確認してください。")
-
-else:  # キーワード分析
-    st.header("🔑 キーワード分析")
-    
-    base_keyword = st.text_input("基本キーワード", placeholder="例: Python")
-    
-    if st.button("関連キーワードを分析", type="primary", use_container_width=True):
-        if base_keyword:
-            if not youtube:
-                st.error("YouTube APIが初期化されていません。")
-            else:
-                with st.spinner("分析中..."):
-                    try:
-                        # 基本キーワードで検索
-                        search_response = youtube.search().list(
-                            q=base_keyword,
-                            part='snippet',
-                            type='video',
-                            maxResults=50
-                        ).execute()
-                        
-                        # レスポンスの検証
-                        if 'items' not in search_response or not search_response['items']:
-                            st.warning("検索結果が見つかりませんでした。")
-                        else:
-                            # キーワードを抽出
-                            keywords = {}
-                            
-                            for item in search_response['items']:
-                                snippet = item.get('snippet', {})
-                                title = snippet.get('title', '').lower()
-                                # タイトルから単語を抽出
-                                words = title.split()
-                                for word in words:
-                                    if len(word) > 3 and word != base_keyword.lower():
-                                        keywords[word] = keywords.get(word, 0) + 1
-                            
-                            # 上位キーワード
-                            top_keywords = sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:20]
-                            
-                            if top_keywords:
-                                # 棒グラフ
-                                df = pd.DataFrame(top_keywords, columns=['キーワード', '出現回数'])
-                                
-                                fig = px.bar(df, 
-                                    x='出現回数', 
-                                    y='キーワード',
-                                    orientation='h',
-                                    color='出現回数',
-                                    color_continuous_scale='Reds'
-                                )
-                                fig.update_layout(height=600)
-                                st.plotly_chart(fig, use_container_width=True)
-                                
-                                # ワードクラウド風の表示
-                                st.subheader("🏷️ 関連キーワード")
-                                cols = st.columns(4)
-                                for idx, (keyword, count) in enumerate(top_keywords):
-                                    with cols[idx % 4]:
-                                        st.button(f"{keyword} ({count})", key=f"kw_{idx}")
-                            else:
-                                st.warning("関連キーワードが見つかりませんでした。")
-                                
-                    except HttpError as e:
-                        st.error(f"APIエラー: {e}")
-                    except Exception as e:
-                        st.error(f"予期しないエラーが発生しました: {e}")
-        else:
-            st.warning("キーワードを入力してください")
-
-# フッター
-st.markdown("---")
+import streamlit as st
+import pandas as pd
+import numpy as np
+import httplib2
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from dotenv import load_dotenv
+import os
+import re
+from collections import Counter
+from datetime import datetime
+import plotly.express as px
+import plotly.graph_objects as go
+
+# ページ設定
+st.set_page_config(
+    page_title="YouTube マーケティング分析ツール",
+    page_icon="📊",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# 環境変数を読み込み
+load_dotenv()
+
+# スタイル設定
+st.markdown("""
+    <style>
+    .main-header {
+        font-size: 3rem;
+        color: #FF0000;
+        text-align: center;
+        margin-bottom: 2rem;
+    }
+    .metric-card {
+        background-color: #f0f2f6;
+        padding: 1rem;
+        border-radius: 0.5rem;
+        text-align: center;
+    }
+    </style>
+""", unsafe_allow_html=True)
+
+# YouTube API設定
+YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+
+# キーワード分析のトークン化用: 英字・ひらがな・カタカナ・漢字の4文字以上の連続を
+# 1回の正規表現走査で抜き出す（split()では日本語タイトルが分割できない）
+TOKEN_RE = re.compile(r"[A-Za-z\u3040-\u30ff\u4e00-\u9fff]{4,}")
+
+# チャンネルURLの各形式（/channel/・/@ハンドル・/c/・/user/）から識別子を
+# 1回の走査で抜き出す。split連鎖は/channel/形式しか扱えず、形式が崩れた
+# 入力でIndexErrorになる
+CHANNEL_URL_RE = re.compile(r'(?:channel/|/@|/c/|/user/)([A-Za-z0-9_\-]+)')
+
+def _date(snippet):
+    """snippetのpublishedAtを日付部分（YYYY-MM-DD）に切り詰める
+
+    未設定でも''[:10]==''なので条件分岐もdictの二重参照も要らない。
+    """
+    return (snippet.get('publishedAt') or '')[:10]
+
+def _require_youtube():
+    """初期化済みのYouTube APIクライアントを返す（未初期化なら例外）"""
+    youtube = init_youtube_api(YOUTUBE_API_KEY)
+    if not youtube:
+        raise RuntimeError("YouTube APIが初期化されていません。APIキーを確認してください。")
+    return youtube
+
+@st.cache_resource
+def init_youtube_api(api_key):
+    """YouTube APIクライアントを初期化
+
+    APIキーを引数で受けてキャッシュキーにする。モジュールグローバルへの
+    暗黙参照と違い、プロセス内の全セッション・全タブが確実に同一の
+    Serviceインスタンスを共有する。
+    """
+    try:
+        if not api_key:
+            st.error("YouTube APIキーが設定されていません。.envファイルを確認してください。")
+            return None
+        # httplib2のクライアントを明示的に渡す。st.cache_resourceでクライアント
+        # ごと保持されるため、TCP/TLSの接続確立をAPI呼び出しのたびに繰り返さず、
+        # キャッシュ可能なレスポンス（discovery文書等）はディスクに保存される
+        http = httplib2.Http(cache='.httpcache', timeout=10)
+        # static_discovery=Trueでライブラリ同梱のスキーマを使い、~300KBの
+        # discovery文書のHTTP取得とパースを起動時から丸ごと省く
+        return build('youtube', 'v3', developerKey=api_key, http=http,
+                     static_discovery=True)
+    except Exception as e:
+        st.error(f"YouTube API初期化エラー: {e}")
+        return None
+
+# APIクライアントを初期化
+youtube = init_youtube_api(YOUTUBE_API_KEY)
+
+# タイトル
+st.markdown('<h1 class="main-header">📺 YouTube マーケティング分析ツール</h1>', unsafe_allow_html=True)
+
+# サイドバー
+st.sidebar.title("🎯 分析メニュー")
+analysis_type = st.sidebar.selectbox(
+    "分析タイプを選択",
+    ["動画検索・分析", "チャンネル分析", "トレンド分析", "競合分析", "キーワード分析"]
+)
+
+# メイン関数
+# 取得系の関数はst.cache_dataでキャッシュする。再実行（ウィジェット操作等）の
+# たびにYouTube APIを呼び直さないため。persist="disk"はttlを無効化して
+# エントリが期限切れしなくなるので使わない（プロセス内キャッシュ+TTLのみ）。
+# キャッシュから再生されるとst.*の副作用は再現されないので、関数はpicklableな
+# 成功結果だけを返し、失敗は例外で送出する（st.cache_dataは例外をキャッシュ
+# しないので、一時的なエラーや未初期化状態が引数ごとに記憶されない）。
+# 表示とエラーの描画は呼び出し側で行う。
+@st.cache_data(ttl=6 * 3600, max_entries=500, show_spinner=False)
+def search_videos(keyword, max_results=10, order="relevance"):
+    """動画を検索して詳細情報を取得
+
+    (DataFrame, 集計dict or None) を返す。集計（件数・合計・平均）は
+    構築ループ中に積み上げるので、呼び出し側でDataFrameの列を走査し直す
+    必要がない。
+    """
+    # 空のキーワードで1回100ユニットのsearch.listを呼ばない
+    if not keyword or not keyword.strip():
+        return pd.DataFrame(), None
+
+    youtube = _require_youtube()
+
+    # 動画を検索
+    search_response = youtube.search().list(
+        q=keyword,
+        part='snippet',
+        type='video',
+        maxResults=max_results,
+        order=order,
+        # 部分レスポンス: ここで使うのは動画IDだけ
+        fields='items(id/videoId)'
+    ).execute()
+
+    # レスポンスの検証
+    if 'items' not in search_response or not search_response['items']:
+        return pd.DataFrame(), None
+
+    video_ids = [item['id']['videoId'] for item in search_response['items']]
+
+    # 動画の詳細情報を取得
+    videos_response = youtube.videos().list(
+        part='statistics,contentDetails,snippet',
+        id=','.join(video_ids),
+        fields=('items(id,statistics(viewCount,likeCount,commentCount),'
+                'snippet(title,channelTitle,publishedAt,thumbnails/medium/url))')
+    ).execute()
+
+    # レスポンスの検証
+    if 'items' not in videos_response or not videos_response['items']:
+        return pd.DataFrame(), None
+
+    # 列ごと（SoA）に組み立ててからDataFrameを構築する。行dictのリストだと
+    # pandasが行→列の転置とスキーマ推定を行単位でやり直すため数倍遅い
+    titles, channel_titles, dates = [], [], []
+    views, likes, comments, rates = [], [], [], []
+    ids, thumbnails = [], []
+    total_views = 0
+    total_rate = 0.0
+
+    for item in videos_response['items']:
+        stats = item.get('statistics', {})
+        snippet = item.get('snippet', {})
+
+        # エンゲージメント率を計算
+        view_count = int(stats.get('viewCount', 0))
+        like_count = int(stats.get('likeCount', 0))
+        comment_count = int(stats.get('commentCount', 0))
+
+        engagement_rate = 0
+        if view_count > 0:
+            engagement_rate = ((like_count + comment_count) / view_count) * 100
+
+        # サムネイルURLの安全な取得
+        thumbnail_url = ""
+        if 'thumbnails' in snippet and 'medium' in snippet['thumbnails']:
+            thumbnail_url = snippet['thumbnails']['medium']['url']
+
+        titles.append(snippet.get('title', 'タイトル不明'))
+        channel_titles.append(snippet.get('channelTitle', 'チャンネル不明'))
+        dates.append(_date(snippet))
+        views.append(view_count)
+        likes.append(like_count)
+        comments.append(comment_count)
+        rates.append(round(engagement_rate, 2))
+        ids.append(item.get('id', ''))
+        thumbnails.append(thumbnail_url)
+        total_views += view_count
+        total_rate += engagement_rate
+
+    df = pd.DataFrame({
+        'タイトル': titles,
+        'チャンネル': channel_titles,
+        '公開日': dates,
+        '視聴回数': pd.array(views, dtype='Int64'),
+        'いいね数': pd.array(likes, dtype='Int64'),
+        'コメント数': pd.array(comments, dtype='Int64'),
+        'エンゲージメント率': rates,
+        '動画ID': ids,
+        'サムネイル': thumbnails
+    })
+
+    n = len(titles)
+    stats = {
+        '件数': n,
+        '総視聴回数': total_views,
+        '平均視聴回数': total_views / n,
+        '平均エンゲージメント率': total_rate / n
+    }
+    return df, stats
+
+@st.cache_data(ttl=6 * 3600, max_entries=500, show_spinner=False)
+def resolve_handle(handle):
+    """@ハンドルをforHandleでチャンネルIDに解決する（未登録ならNone）
+
+    副作用がなくpicklableな値だけを返すので、同じハンドルの再入力は
+    APIを呼ばずキャッシュから返る。HttpErrorはそのまま送出し、呼び出し側で
+    検索フォールバックに回す（Noneを返すとエラーまでキャッシュされてしまう）。
+    """
+    youtube = _require_youtube()
+
+    response = youtube.channels().list(
+        part='id',
+        forHandle=handle.replace('@', ''),
+        fields='items/id'
+    ).execute()
+
+    if 'items' in response and response['items']:
+        return response['items'][0]['id']
+    return None
+
+def get_channel_id_from_handle(handle):
+    """YouTubeハンドル（@username）から直接チャンネルIDを取得する代替方法"""
+    try:
+        # まず channels().list() の forHandle パラメータを使用（キャッシュ付き）
+        try:
+            channel_id = resolve_handle(handle)
+            if channel_id:
+                return channel_id
+        except HttpError:
+            # forHandle が利用できない場合は検索フォールバックに進む
+            pass
+
+        # 検索APIを使用
+        search_queries = [
+            f'"{handle}"',
+            f'"{handle.replace("@", "")}"',
+            handle.replace('@', ''),
+            handle.replace('@', '').replace('_', ' ')
+        ]
+        
+        for query in search_queries:
+            try:
+                search_response = youtube.search().list(
+                    q=query,
+                    part='snippet',
+                    type='channel',
+                    maxResults=10
+                ).execute()
+                
+                if 'items' in search_response and search_response['items']:
+                    # より厳密なマッチングを試行
+                    handle_clean = handle.replace('@', '').lower()
+                    
+                    for item in search_response['items']:
+                        channel_title = item['snippet']['channelTitle'].lower()
+                        
+                        # 様々なマッチングパターンを試行
+                        if (handle_clean in channel_title or
+                            channel_title.replace(' ', '_') == handle_clean or
+                            channel_title.replace(' ', '') == handle_clean or
+                            handle_clean.replace('_', ' ') in channel_title):
+                            return item['snippet']['channelId']
+                    
+                    # 完全マッチがない場合は最初の結果を返す
+                    return search_response['items'][0]['snippet']['channelId']
+                        
+            except Exception as e:
+                st.write(f"検索クエリ '{query}' でエラー: {e}")
+                continue
+        
+        return None
+        
+    except Exception as e:
+        st.error(f"ハンドル検索エラー: {e}")
+        return None
+
+def get_channel_id_from_input(channel_input):
+    """様々な形式の入力からチャンネルIDを取得"""
+    if not youtube:
+        return None
+    
+    try:
+        # 既にチャンネルIDの場合（UCで始まる24文字）
+        if channel_input.startswith('UC') and len(channel_input) == 24:
+            return channel_input
+
+        # URLからの識別子抽出は1回の正規表現走査で済ませる
+        m = CHANNEL_URL_RE.search(channel_input)
+
+        # カスタムURL（@ユーザー名）の場合
+        if '@' in channel_input:
+            # @ユーザー名の部分を抽出
+            if m and 'youtube.com/@' in channel_input:
+                handle = '@' + m.group(1)
+            else:
+                handle = channel_input if channel_input.startswith('@') else '@' + channel_input
+            
+            st.info(f"検索中のハンドル: {handle}")
+            
+            # 新しいハンドル検索方法を使用
+            channel_id = get_channel_id_from_handle(handle)
+            if channel_id:
+                return channel_id
+            
+            # 従来の検索方法も試行
+            username = handle.replace('@', '')
+            st.info(f"従来の検索方法でユーザー名を検索: {username}")
+            
+            search_response = youtube.search().list(
+                q=username,
+                part='snippet',
+                type='channel',
+                maxResults=10
+            ).execute()
+            
+            st.write(f"検索結果数: {len(search_response.get('items', []))}")
+            
+            # デバッグ情報を表示
+            if 'items' in search_response and search_response['items']:
+                st.write("見つかったチャンネル:")
+                for i, item in enumerate(search_response['items']):
+                    channel_title = item['snippet']['channelTitle']
+                    channel_id = item['snippet']['channelId']
+                    st.write(f"{i+1}. {channel_title} (ID: {channel_id})")
+                
+                return search_response['items'][0]['snippet']['channelId']
+        
+        # youtube.com/channel/形式
+        elif 'youtube.com/channel/' in channel_input:
+            return m.group(1) if m else None
+
+        # youtube.com/c/形式またはyoutube.com/user/形式
+        elif 'youtube.com/c/' in channel_input or 'youtube.com/user/' in channel_input:
+            if not m:
+                return None
+            username = m.group(1)
+
+            # チャンネル名で検索
+            search_response = youtube.search().list(
+                q=username,
+                part='snippet',
+                type='channel',
+                maxResults=5
+            ).execute()
+            
+            if 'items' in search_response and search_response['items']:
+                return search_response['items'][0]['snippet']['channelId']
+        
+        # それ以外の場合は検索で試行
+        else:
+            search_response = youtube.search().list(
+                q=channel_input,
+                part='snippet',
+                type='channel',
+                maxResults=5
+            ).execute()
+            
+            if 'items' in search_response and search_response['items']:
+                return search_response['items'][0]['snippet']['channelId']
+        
+        return None
+        
+    except Exception as e:
+        st.error(f"チャンネルID取得エラー: {e}")
+        st.write(f"エラー詳細: {str(e)}")
+        return None
+
+@st.cache_data(ttl=6 * 3600, max_entries=500, show_spinner=False)
+def analyze_channel(channel_id):
+    """チャンネルの詳細分析
+
+    (チャンネル情報dict or None, 最新動画DataFrame) を返す。
+    チャンネルが見つからない場合は (None, 空DataFrame)。
+    """
+    youtube = _require_youtube()
+
+    # アップロード再生リストIDはチャンネルIDから決定的に導ける（UC... → UU...）
+    # ので、channels.listの結果を待つ必要がない。チャンネル情報と最新動画の
+    # 2リクエストをバッチHTTPにまとめ、往復を2回から1回に減らす
+    responses, errors = {}, {}
+
+    def _collect(request_id, response, exception):
+        if exception is not None:
+            errors[request_id] = exception
+        else:
+            responses[request_id] = response
+
+    batch = youtube.new_batch_http_request(callback=_collect)
+    batch.add(youtube.channels().list(
+        part='statistics,snippet',
+        id=channel_id,
+        fields=('items(statistics(subscriberCount,videoCount,viewCount),'
+                'snippet(title,publishedAt,description,thumbnails/high/url))')
+    ), request_id='channel')
+    if channel_id.startswith('UC'):
+        batch.add(youtube.playlistItems().list(
+            part='snippet',
+            playlistId='UU' + channel_id[2:],
+            maxResults=10,
+            fields='items/snippet(title,publishedAt)'
+        ), request_id='videos')
+    batch.execute()
+
+    if 'channel' in errors:
+        raise errors['channel']
+
+    channel_response = responses.get('channel')
+
+    # レスポンスの検証を強化
+    if not channel_response or 'items' not in channel_response or not channel_response['items']:
+        return None, pd.DataFrame()
+
+    item = channel_response['items'][0]
+    stats = item.get('statistics', {})
+    snippet = item.get('snippet', {})
+
+    # サムネイルURLの安全な取得
+    thumbnail_url = ""
+    if 'thumbnails' in snippet and 'high' in snippet['thumbnails']:
+        thumbnail_url = snippet['thumbnails']['high']['url']
+
+    channel_data = {
+        'チャンネル名': snippet.get('title', 'チャンネル名不明'),
+        '登録者数': int(stats.get('subscriberCount', 0)),
+        '動画本数': int(stats.get('videoCount', 0)),
+        '総視聴回数': int(stats.get('viewCount', 0)),
+        '開設日': _date(snippet),
+        '説明': (snippet.get('description', '')[:200] + "...") if snippet.get('description') else "説明なし",
+        'サムネイル': thumbnail_url
+    }
+
+    # 最新動画（取れなくてもチャンネル情報自体は返す）
+    recent_videos = pd.DataFrame()
+    playlist_response = responses.get('videos')
+
+    if playlist_response and playlist_response.get('items'):
+        video_titles, video_dates = [], []
+        for video in playlist_response['items']:
+            video_snippet = video.get('snippet', {})
+            video_titles.append(video_snippet.get('title', 'タイトル不明'))
+            video_dates.append(_date(video_snippet))
+        recent_videos = pd.DataFrame({'タイトル': video_titles, '公開日': video_dates})
+
+    return channel_data, recent_videos
+
+@st.cache_data(ttl=6 * 3600, max_entries=500, show_spinner=False)
+def fetch_trending_videos(region, category_id, max_results):
+    """トレンド動画をDataFrameで取得する（見つからなければ空）"""
+    youtube = _require_youtube()
+
+    request_params = {
+        'part': 'snippet,statistics',
+        'chart': 'mostPopular',
+        'regionCode': region,
+        'maxResults': max_results,
+        'fields': ('items(id,statistics(viewCount,likeCount),'
+                   'snippet(title,channelTitle,thumbnails/medium/url))')
+    }
+
+    if category_id != "0":
+        request_params['videoCategoryId'] = category_id
+
+    response = youtube.videos().list(**request_params).execute()
+
+    # レスポンスの検証
+    if 'items' not in response or not response['items']:
+        return pd.DataFrame()
+
+    titles, channel_titles, views, likes = [], [], [], []
+    thumbnails, ids = [], []
+
+    for item in response['items']:
+        stats = item.get('statistics', {})
+        snippet = item.get('snippet', {})
+
+        # サムネイルURLの安全な取得
+        thumbnail_url = ""
+        if 'thumbnails' in snippet and 'medium' in snippet['thumbnails']:
+            thumbnail_url = snippet['thumbnails']['medium']['url']
+
+        titles.append(snippet.get('title', 'タイトル不明'))
+        channel_titles.append(snippet.get('channelTitle', 'チャンネル不明'))
+        views.append(int(stats.get('viewCount', 0)))
+        likes.append(int(stats.get('likeCount', 0)))
+        thumbnails.append(thumbnail_url)
+        ids.append(item.get('id', ''))
+
+    return pd.DataFrame({
+        'タイトル': titles,
+        'チャンネル': channel_titles,
+        '視聴回数': pd.array(views, dtype='Int64'),
+        'いいね数': pd.array(likes, dtype='Int64'),
+        'サムネイル': thumbnails,
+        '動画ID': ids
+    })
+
+@st.cache_data(ttl=6 * 3600, max_entries=500, show_spinner=False)
+def fetch_keyword_counts(base_keyword, max_results=50):
+    """基本キーワードの検索結果タイトルから関連キーワードの出現回数を集計
+
+    (キーワード, 出現回数)の上位リストを返す（見つからなければ空）。
+    """
+    youtube = _require_youtube()
+
+    # 基本キーワードで検索
+    search_response = youtube.search().list(
+        q=base_keyword,
+        part='snippet',
+        type='video',
+        maxResults=max_results,
+        fields='items/snippet/title'
+    ).execute()
+
+    # レスポンスの検証
+    if 'items' not in search_response or not search_response['items']:
+        return []
+
+    # キーワードを抽出（Counter.updateはC実装なのでタイトル単位で一括集計）
+    counter = Counter()
+    base_lower = base_keyword.lower()
+
+    for item in search_response['items']:
+        snippet = item.get('snippet', {})
+        title = snippet.get('title', '').lower()
+        counter.update(w for w in TOKEN_RE.findall(title) if w != base_lower)
+
+    # 上位キーワード
+    return counter.most_common(20)
+
+def fetch_channels(channel_ids):
+    """競合分析用にチャンネル統計をまとめて取得する
+
+    channels.listはカンマ区切りで最大50件のIDを1リクエストで受け付けるので、
+    チャンネル数分の呼び出しを1回に畳み込む。レスポンスの並び順は保証され
+    ないため、チャンネルIDをキーにした表示用dictの辞書を返す。失敗は例外で
+    送出し、呼び出し側が原因を1回だけ表示する（握り潰すとクォータ切れが
+    チャンネル数分の「取得に失敗」警告にしか見えない）。
+    """
+    if not channel_ids:
+        return {}
+
+    youtube = _require_youtube()
+
+    response = youtube.channels().list(
+        part='statistics,snippet',
+        id=','.join(channel_ids),
+        maxResults=50,
+        fields='items(id,statistics(subscriberCount,videoCount,viewCount),snippet/title)'
+    ).execute()
+
+    channels_by_id = {}
+    for item in response.get('items', []):
+        stats = item.get('statistics', {})
+        snippet = item.get('snippet', {})
+
+        video_count = max(int(stats.get('videoCount', 1)), 1)  # ゼロ除算を防ぐ
+
+        channels_by_id[item['id']] = {
+            'チャンネル名': snippet.get('title', 'チャンネル名不明'),
+            '登録者数': int(stats.get('subscriberCount', 0)),
+            '動画本数': int(stats.get('videoCount', 0)),
+            '総視聴回数': int(stats.get('viewCount', 0)),
+            '平均視聴回数': int(stats.get('viewCount', 0)) / video_count
+        }
+    return channels_by_id
+
+# Plotly図の構築もDataFrameをキーにキャッシュする。図の生成は50点規模でも
+# ホバーデータ込みのJSONシリアライズを伴い、dfが変わらない再実行（ウィジェット
+# 操作やスクロール等）のたびにやり直す意味がないため。go.Figureはpicklable。
+@st.cache_data(show_spinner=False)
+def _scatter_fig(df):
+    """検索結果の視聴回数×エンゲージメント率の散布図"""
+    fig = px.scatter(df,
+        x='視聴回数',
+        y='エンゲージメント率',
+        size='いいね数',
+        hover_data=['タイトル', 'チャンネル'],
+        color='エンゲージメント率',
+        color_continuous_scale='Reds'
+    )
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_data(show_spinner=False)
+def _trending_bar_fig(df):
+    """トレンド上位10本の視聴回数棒グラフ"""
+    fig = px.bar(df.head(10),
+        x='タイトル',
+        y='視聴回数',
+        color='視聴回数',
+        color_continuous_scale='Reds'
+    )
+    fig.update_xaxes(tickangle=-45)
+    fig.update_layout(height=500)
+    return fig
+
+@st.cache_data(show_spinner=False)
+def _keyword_bar_fig(df):
+    """関連キーワードの出現回数棒グラフ"""
+    fig = px.bar(df,
+        x='出現回数',
+        y='キーワード',
+        orientation='h',
+        color='出現回数',
+        color_continuous_scale='Reds'
+    )
+    fig.update_layout(height=600)
+    return fig
+
+@st.cache_data(show_spinner=False)
+def _radar_fig(df):
+    """競合チャンネル比較のレーダーチャート（正規化込み）"""
+    # 正規化はnumpyのブロードキャスト1回で済ませる（df.copy()と
+    # 列ごとのpandas代入4回を置き換え）
+    metric_cols = ['登録者数', '動画本数', '総視聴回数', '平均視聴回数']
+    mat = df[metric_cols].to_numpy(float)
+    maxes = mat.max(axis=0)
+    maxes[maxes == 0] = 1  # ゼロ除算を防ぐ
+    norm = mat / maxes * 100
+
+    # ポリゴンを閉じるための先頭値の複製もhstack1回
+    closed = np.hstack([norm, norm[:, :1]])
+    theta = metric_cols + metric_cols[:1]
+
+    fig = go.Figure()
+
+    for name, values in zip(df['チャンネル名'], closed):
+        fig.add_trace(
+            go.Scatterpolar(
+                r=values,
+                theta=theta,
+                fill='toself',
+                name=name
+            )
+        )
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )),
+        showlegend=True,
+        height=500
+    )
+    return fig
+
+# 結果の描画はst.fragmentで切り出す。表の列操作やキーワードボタンの
+# クリック等、フラグメント内のウィジェット操作ではこのブロックだけが
+# 再実行され、スクリプト全体（上流のAPI呼び出しを含む）は走らない。
+# 直近の取得結果はst.session_stateに保持し、再実行をまたいで表示を残す。
+@st.fragment
+def _render_search_results(df, stats):
+    """検索結果の統計・散布図・動画一覧を描画"""
+    # メトリクスの表示（集計は取得時に積み上げ済みのスカラーをそのまま使う）
+    st.subheader("📊 検索結果の統計")
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("検索結果数", f"{stats['件数']}件")
+    with col2:
+        st.metric("平均視聴回数", f"{stats['平均視聴回数']:,.0f}回")
+    with col3:
+        st.metric("平均エンゲージメント率", f"{stats['平均エンゲージメント率']:.2f}%")
+    with col4:
+        st.metric("総視聴回数", f"{stats['総視聴回数']:,}回")
+
+    # グラフ表示
+    st.subheader("📈 視聴回数とエンゲージメント率の関係")
+    st.plotly_chart(_scatter_fig(df), use_container_width=True)
+
+    # 動画リスト
+    # 1行ごとにst.columns/st.metricを組むとStreamlit要素が
+    # 行数×7個生成されて描画が重くなるため、1つのst.dataframeに
+    # まとめてImageColumn/LinkColumnで表現する
+    st.subheader("🎥 動画一覧")
+    df_view = df.assign(リンク='https://youtube.com/watch?v=' + df['動画ID'])
+    st.dataframe(
+        df_view.drop(columns=['動画ID']),
+        column_config={
+            'サムネイル': st.column_config.ImageColumn('サムネイル'),
+            'リンク': st.column_config.LinkColumn('リンク', display_text='YouTubeで見る'),
+            '視聴回数': st.column_config.NumberColumn(format='localized'),
+            'いいね数': st.column_config.NumberColumn(format='localized'),
+            'コメント数': st.column_config.NumberColumn(format='localized'),
+            'エンゲージメント率': st.column_config.NumberColumn(format='%.2f%%'),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+
+@st.fragment
+def _render_trending(df):
+    """トレンド動画の棒グラフと一覧を描画"""
+    st.subheader("📊 トレンド動画の視聴回数")
+    st.plotly_chart(_trending_bar_fig(df), use_container_width=True)
+
+    # 動画リスト（検索結果と同様、行ループではなく1つの表で描画）
+    st.subheader("🎥 トレンド動画")
+    df_view = df.assign(リンク='https://youtube.com/watch?v=' + df['動画ID'])
+    st.dataframe(
+        df_view.drop(columns=['動画ID']),
+        column_config={
+            'サムネイル': st.column_config.ImageColumn('サムネイル'),
+            'リンク': st.column_config.LinkColumn('リンク', display_text='YouTubeで見る'),
+            '視聴回数': st.column_config.NumberColumn(format='localized'),
+            'いいね数': st.column_config.NumberColumn(format='localized'),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+
+@st.fragment
+def _render_keyword_results(top_keywords):
+    """関連キーワードの棒グラフとボタングリッドを描画"""
+    # 棒グラフ
+    df = pd.DataFrame(top_keywords, columns=['キーワード', '出現回数'])
+    st.plotly_chart(_keyword_bar_fig(df), use_container_width=True)
+
+    # ワードクラウド風の表示
+    st.subheader("🏷️ 関連キーワード")
+    cols = st.columns(4)
+    for idx, (keyword, count) in enumerate(top_keywords):
+        with cols[idx % 4]:
+            st.button(f"{keyword} ({count})", key=f"kw_{idx}")
+
+# メインコンテンツ
+if analysis_type == "動画検索・分析":
+    st.header("🔍 動画検索・分析")
+    
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        keyword = st.text_input("検索キーワード", placeholder="例: Python プログラミング")
+    with col2:
+        max_results = st.number_input("取得件数", min_value=1, max_value=50, value=10)
+    with col3:
+        order = st.selectbox("並び順", ["relevance", "date", "viewCount", "rating"])
+    
+    if st.button("検索", type="primary", use_container_width=True):
+        if keyword:
+            df = stats = None
+            try:
+                with st.spinner("検索中..."):
+                    df, stats = search_videos(keyword, max_results, order)
+            except HttpError as e:
+                st.error(f"APIエラー: {e}")
+            except RuntimeError as e:
+                st.error(str(e))
+            except Exception as e:
+                st.error(f"予期しないエラーが発生しました: {e}")
+
+            if df is not None:
+                if df.empty:
+                    st.warning("検索結果が見つかりませんでした。")
+                else:
+                    st.session_state['search_df'] = df
+                    st.session_state['search_stats'] = stats
+        else:
+            st.warning("検索キーワードを入力してください")
+
+    if 'search_df' in st.session_state:
+        _render_search_results(st.session_state['search_df'],
+                               st.session_state['search_stats'])
+
+elif analysis_type == "チャンネル分析":
+    st.header("📺 チャンネル分析")
+    
+    channel_input = st.text_input(
+        "チャンネルID、カスタムURL、またはチャンネル名", 
+        placeholder="例: @The_FirstTake, UCNtZPzvkjjB3EuPMNY71cmA, または First Take"
+    )
+    
+    if st.button("分析", type="primary", use_container_width=True):
+        if channel_input:
+            with st.spinner("チャンネルIDを取得中..."):
+                channel_id = get_channel_id_from_input(channel_input)
+                
+            if channel_id:
+                st.success(f"チャンネルID: {channel_id}")
+                channel_data = recent_videos = None
+                try:
+                    with st.spinner("分析中..."):
+                        channel_data, recent_videos = analyze_channel(channel_id)
+                except HttpError as e:
+                    st.error(f"APIエラー: {e}")
+                except RuntimeError as e:
+                    st.error(str(e))
+                except Exception as e:
+                    st.error(f"予期しないエラーが発生しました: {e}")
+                else:
+                    if channel_data is None:
+                        st.error("チャンネルが見つかりません。チャンネルIDを確認してください。")
+
+                if channel_data:
+                    col1, col2 = st.columns([1, 3])
+                    with col1:
+                        if channel_data['サムネイル']:
+                            # st.imageはStreamlitのメディアエンドポイント経由で
+                            # 再配信されることがあるので、<img>を直接埋め込んで
+                            # ブラウザにyt3.ggpht.comから並列取得させる
+                            st.markdown(
+                                f'<img src="{channel_data["サムネイル"]}" width="200">',
+                                unsafe_allow_html=True
+                            )
+                    with col2:
+                        st.title(channel_data['チャンネル名'])
+                        st.text(f"開設日: {channel_data['開設日']}")
+                    
+                    # メトリクス
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("登録者数", f"{channel_data['登録者数']:,}")
+                    with col2:
+                        st.metric("動画本数", f"{channel_data['動画本数']:,}")
+                    with col3:
+                        st.metric("総視聴回数", f"{channel_data['総視聴回数']:,}")
+                    with col4:
+                        avg_views = channel_data['総視聴回数'] / max(channel_data['動画本数'], 1)
+                        st.metric("平均視聴回数", f"{avg_views:,.0f}")
+                    
+                    # 説明
+                    st.subheader("📝 チャンネル説明")
+                    st.text(channel_data['説明'])
+                    
+                    # 最新動画
+                    if not recent_videos.empty:
+                        st.subheader("🎬 最新動画")
+                        st.dataframe(recent_videos, use_container_width=True)
+            else:
+                st.error("チャンネルが見つかりませんでした。入力内容を確認してください。")
+        else:
+            st.warning("チャンネル情報を入力してください")
+
+elif analysis_type == "トレンド分析":
+    st.header("🔥 トレンド分析")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        region = st.selectbox("地域", ["JP", "US", "GB", "KR", "IN"])
+    with col2:
+        category = st.selectbox(
+            "カテゴリ",
+            ["0 - すべて", "10 - 音楽", "20 - ゲーム", "22 - ブログ", "23 - コメディ", "24 - エンターテイメント"]
+        )
+    with col3:
+        max_results = st.number_input("取得件数", min_value=1, max_value=50, value=10)
+    
+    if st.button("トレンドを取得", type="primary", use_container_width=True):
+        if not youtube:
+            st.error("YouTube APIが初期化されていません。")
+        else:
+            category_id = category.split(" - ")[0]
+            df = None
+            try:
+                with st.spinner("取得中..."):
+                    df = fetch_trending_videos(region, category_id, max_results)
+            except HttpError as e:
+                st.error(f"APIエラー: {e}")
+            except RuntimeError as e:
+                st.error(str(e))
+            except Exception as e:
+                st.error(f"予期しないエラーが発生しました: {e}")
+
+            if df is not None:
+                if df.empty:
+                    st.warning("トレンド動画が見つかりませんでした。")
+                else:
+                    st.session_state['trending_df'] = df
+
+    if 'trending_df' in st.session_state:
+        _render_trending(st.session_state['trending_df'])
+
+elif analysis_type == "競合分析":
+    st.header("⚔️ 競合チャンネル分析")
+    
+    st.info("複数のチャンネルを比較分析します（最大5つまで）")
+    
+    channels = []
+    for i in range(5):
+        channel = st.text_input(f"チャンネル情報 {i+1} (ID、@ユーザー名、またはチャンネル名)", key=f"channel_{i}")
+        if channel:
+            channels.append(channel)
+    
+    if st.button("比較分析", type="primary", use_container_width=True) and channels:
+        if not youtube:
+            st.error("YouTube APIが初期化されていません。")
+        else:
+            with st.spinner("分析中..."):
+                # まず入力をチャンネルIDに解決（st.*の表示を伴うのでメインスレッドで）
+                actual_channel_ids = []
+                for channel_id in channels:
+                    actual_channel_id = get_channel_id_from_input(channel_id)
+                    if actual_channel_id:
+                        actual_channel_ids.append(actual_channel_id)
+                    else:
+                        st.warning(f"チャンネル '{channel_id}' が見つかりませんでした。")
+
+                # 統計の取得はIDをまとめた1回のchannels.list呼び出しで済ませ、
+                # 入力順を保ったまま組み立て直す。失敗はここで1回だけ表示する
+                try:
+                    channels_by_id = fetch_channels(actual_channel_ids)
+                except HttpError as e:
+                    st.error(f"APIエラー: {e}")
+                except RuntimeError as e:
+                    st.error(str(e))
+                except Exception as e:
+                    st.error(f"予期しないエラーが発生しました: {e}")
+                else:
+                    comparison_data = []
+                    for channel_id in actual_channel_ids:
+                        result = channels_by_id.get(channel_id)
+                        if result is None:
+                            st.warning(f"チャンネル '{channel_id}' の取得に失敗しました。")
+                        else:
+                            comparison_data.append(result)
+                
+                    if comparison_data:
+                        df = pd.DataFrame({
+                            'チャンネル名': [c['チャンネル名'] for c in comparison_data],
+                            '登録者数': pd.array([c['登録者数'] for c in comparison_data], dtype='Int64'),
+                            '動画本数': pd.array([c['動画本数'] for c in comparison_data], dtype='Int64'),
+                            '総視聴回数': pd.array([c['総視聴回数'] for c in comparison_data], dtype='Int64'),
+                            '平均視聴回数': [c['平均視聴回数'] for c in comparison_data]
+                        })
+                    
+                        # レーダーチャート
+                        st.subheader("📊 総合比較")
+                        st.plotly_chart(_radar_fig(df), use_container_width=True)
+                    
+                        # 詳細テーブル
+                        st.subheader("📋 詳細データ")
+                        st.dataframe(df.style.format({
+                            '登録者数': '{:,}',
+                            '動画本数': '{:,}',
+                            '総視聴回数': '{:,}',
+                            '平均視聴回数': '{:,.0f}'
+                        }), use_container_width=True)
+                    else:
+                        st.error("チャンネルデータを取得できませんでした。チャンネルIDを確認してください。")
+
+else:  # キーワード分析
+    st.header("🔑 キーワード分析")
+    
+    base_keyword = st.text_input("基本キーワード", placeholder="例: Python")
+    
+    if st.button("関連キーワードを分析", type="primary", use_container_width=True):
+        if base_keyword:
+            if not youtube:
+                st.error("YouTube APIが初期化されていません。")
+            else:
+                top_keywords = None
+                try:
+                    with st.spinner("分析中..."):
+                        top_keywords = fetch_keyword_counts(base_keyword)
+                except HttpError as e:
+                    st.error(f"APIエラー: {e}")
+                except RuntimeError as e:
+                    st.error(str(e))
+                except Exception as e:
+                    st.error(f"予期しないエラーが発生しました: {e}")
+
+                if top_keywords is not None:
+                    if top_keywords:
+                        st.session_state['keyword_counts'] = top_keywords
+                    else:
+                        st.warning("関連キーワードが見つかりませんでした。")
+        else:
+            st.warning("キーワードを入力してください")
+
+    if 'keyword_counts' in st.session_state:
+        _render_keyword_results(st.session_state['keyword_counts'])
+
+# フッター
+st.markdown("---")
 st.markdown("🚀 YouTube マーケティング分析ツール | Powered by YouTube Data API v3")
\ No newline at end of file